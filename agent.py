@@ -16,6 +16,8 @@ from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, END, START
 from langgraph.prebuilt import ToolNode, tools_condition
 from langgraph.graph.message import add_messages
+from prompt_toolkit import PromptSession
+from prompt_toolkit.patch_stdout import patch_stdout
 
 # --- Configuration Checks ---
 # Check for mandatory Google API Key
@@ -28,6 +30,28 @@ IS_TRACING_ENABLED = os.getenv("LANGCHAIN_TRACING") == "true" and os.getenv("LAN
 class AgentState(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
 
+# --- LLM and Prompt (independent of the tools, so built once at import) ---
+llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0)
+
+system_prompt = (
+    "You are a helpful assistant. Your job is to answer user questions by using the provided tools."
+    "\n\nHere are your tools:"
+    "\n- `CompanyDatabaseTool`: Use this for any questions about company data like employees, products, or sales."
+    "\n- `PDFDocumentSearchTool`: Use this for specific questions about the technical PDF on drug formulation and wound healing."
+    "\n- `PDFDocumentBatchSearchTool`: Same as `PDFDocumentSearchTool`, but takes a list of questions. Use it instead when you need to look up several separate questions in the PDF at once."
+    "\n\nYour instructions:"
+    "\n1. When the user asks a question, decide which tool is the most appropriate."
+    "\n2. Use the user's actual question as the query for the tool. For general summarization, use the user's request as the query."
+    "\n3. After the tool returns a result, use that information to give a final, conversational answer to the user."
+)
+
+prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", system_prompt),
+        MessagesPlaceholder(variable_name="messages"),
+    ]
+)
+
 async def main():
     """
     Sets up and runs the asynchronous agent application using LangGraph's ToolNode.
@@ -46,6 +70,8 @@ async def main():
                 tool.name = "CompanyDatabaseTool"
             elif tool.name == "answer_pdf_question":
                 tool.name = "PDFDocumentSearchTool"
+            elif tool.name == "answer_pdf_questions_batch":
+                tool.name = "PDFDocumentBatchSearchTool"
 
         print("\nSuccessfully loaded and adapted tools:")
         for t in tools:
@@ -58,26 +84,6 @@ async def main():
         return
 
     # --- Agent and Graph Setup ---
-    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0)
-    
-    system_prompt = (
-        "You are a helpful assistant. Your job is to answer user questions by using the provided tools."
-        "\n\nHere are your tools:"
-        "\n- `CompanyDatabaseTool`: Use this for any questions about company data like employees, products, or sales."
-        "\n- `PDFDocumentSearchTool`: Use this for specific questions about the technical PDF on drug formulation and wound healing."
-        "\n\nYour instructions:"
-        "\n1. When the user asks a question, decide which tool is the most appropriate."
-        "\n2. Use the user's actual question as the query for the tool. For general summarization, use the user's request as the query."
-        "\n3. After the tool returns a result, use that information to give a final, conversational answer to the user."
-    )
-
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system_prompt),
-            MessagesPlaceholder(variable_name="messages"),
-        ]
-    )
-    
     llm_with_tools = llm.bind_tools(tools)
     agent_chain = prompt | llm_with_tools
 
@@ -105,9 +111,12 @@ async def main():
         print("--- LangSmith Tracing is DISABLED ---")
         print("(To enable, set LANGCHAIN_TRACING_V2='true' and LANGCHAIN_API_KEY in your .env file)")
         
+    # Read input natively on the event loop instead of in a worker thread
+    session = PromptSession()
     while True:
         try:
-            user_query = await asyncio.to_thread(input, "\n> ")
+            with patch_stdout():
+                user_query = await session.prompt_async("\n> ")
             if user_query.lower() == "exit":
                 break
             
@@ -2,6 +2,12 @@
 # (Or whatever your indexing script is named)
 
 import os
+# Must be set before tokenizers is imported so it doesn't start its own thread pool
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+import torch
+torch.set_num_threads(min(8, os.cpu_count() or 1))
+torch.set_num_interop_threads(1)
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from sentence_transformers import SentenceTransformer
@@ -12,6 +18,15 @@ PDF_PATH = "/Users/prabhudev.guntur/Downloads/FORMULATION & EVALUATION OF WOUND
 CHROMA_DB_PATH = "./chroma_db"
 COLLECTION_NAME = "pdf_rag_collection"
 EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+INSERT_BATCH_SIZE = 200  # Chunks per collection.add() call
+
+def _detect_device() -> str:
+    """Picks the fastest available device for the embedding model."""
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
 
 def main():
     print("--- Starting RAG Indexing Process ---")
@@ -20,30 +35,38 @@ def main():
     print(f"Loading text from '{PDF_PATH}'...")
     loader = PyPDFLoader(PDF_PATH)
     doc = loader.load()
-    # PyPDFLoader returns a list of documents, one per page. We join them.
-    full_document_text = "\n".join([page.page_content for page in doc])
-    print(f"Successfully extracted {len(full_document_text)} characters.")
+    # PyPDFLoader returns a list of documents, one per page.
+    print(f"Successfully extracted {sum(len(page.page_content) for page in doc)} characters from {len(doc)} pages.")
     
     # 2. Chunk the document text
+    # Split the pages directly instead of joining them into one big string first;
+    # each chunk keeps the metadata (including page number) of its page.
     print("Chunking document text...")
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    text_chunks = text_splitter.split_text(full_document_text)
+    page_chunks = text_splitter.split_documents(doc)
+    text_chunks = [chunk.page_content for chunk in page_chunks]
     print(f"Text split into {len(text_chunks)} chunks.")
 
     # 3. Load the embedding model
-    print(f"Loading embedding model '{EMBEDDING_MODEL_NAME}'...")
-    embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    device = _detect_device()
+    print(f"Loading embedding model '{EMBEDDING_MODEL_NAME}' on '{device}'...")
+    embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME, device=device)
 
     # 4. Setup the vector store
     print(f"Setting up vector store at '{CHROMA_DB_PATH}'...")
     db_client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
 
     # If the collection exists, delete it for a fresh build
-    if COLLECTION_NAME in [c.name for c in db_client.list_collections()]:
-        print(f"Collection '{COLLECTION_NAME}' already exists. Deleting it for a fresh build.")
+    try:
         db_client.delete_collection(name=COLLECTION_NAME)
+        print(f"Collection '{COLLECTION_NAME}' already existed. Deleted it for a fresh build.")
+    except ValueError:
+        # Raised when the collection doesn't exist yet, i.e. on a first build
+        print(f"Collection '{COLLECTION_NAME}' does not exist yet. Creating it.")
 
-    collection = db_client.create_collection(name=COLLECTION_NAME)
+    # MiniLM is trained for cosine similarity; on normalized embeddings hnswlib
+    # scores this with a plain inner product instead of the default L2.
+    collection = db_client.create_collection(name=COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
 
     # 5. Generate embeddings and store them
     print("Generating embeddings and storing chunks in the vector store...")
@@ -52,17 +75,36 @@ def main():
     # We must pass the actual text chunks to the 'documents' parameter.
     
     # Create simple metadata (optional, but good practice)
-    chunk_metadatas = [{"source": PDF_PATH, "chunk_num": i} for i in range(len(text_chunks))]
+    chunk_metadatas = [
+        {"source": PDF_PATH, "chunk_num": i, "page": chunk.metadata["page"]}
+        for i, chunk in enumerate(page_chunks)
+    ]
     
     # Create unique IDs for each chunk
     chunk_ids = [f"chunk_{i}" for i in range(len(text_chunks))]
 
-    # Add to the collection correctly
-    collection.add(
-        documents=text_chunks,  # The list of text strings goes here
-        ids=chunk_ids,
-        metadatas=chunk_metadatas
-    )
+    # Embed all chunks up front with our own model so Chroma doesn't run
+    # its default embedding function row-by-row during the insert.
+    # Keep this a single call over the whole list: encode() sorts the inputs
+    # by length before batching (and restores the original order afterwards),
+    # so similarly sized chunks share a batch and little compute goes to padding.
+    chunk_embeddings = embedding_model.encode(
+        text_chunks,
+        batch_size=64,
+        show_progress_bar=True,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    ).tolist()
+
+    # Add to the collection in fixed-size batches to keep each insert bounded
+    for i in range(0, len(chunk_ids), INSERT_BATCH_SIZE):
+        batch = slice(i, i + INSERT_BATCH_SIZE)
+        collection.add(
+            embeddings=chunk_embeddings[batch],
+            documents=text_chunks[batch],  # The list of text strings goes here
+            ids=chunk_ids[batch],
+            metadatas=chunk_metadatas[batch]
+        )
 
     print("\n--- RAG Indexing Process Complete ---")
     print(f"Vector store created with {collection.count()} items.")
@@ -1,6 +1,7 @@
 # file: sql_tool_server.py
 import sqlite3
 import os
+import asyncio
 import re
 from dotenv import load_dotenv
 from fastmcp import FastMCP, Context
@@ -9,7 +10,6 @@ from pydantic import BaseModel, Field
 # --- LangChain Imports for Structured Output ---
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 
 
 # --- Configuration & Setup ---
@@ -41,6 +41,49 @@ def get_db_schema(db_path: str) -> str | None:
         print(f"Error reading database schema: {e}")
         return None
 
+# The schema doesn't change while the server is running, so read it once.
+DB_SCHEMA = get_db_schema(DB_FILE)
+if not DB_SCHEMA:
+    raise ValueError(f"FATAL ERROR: Database file '{DB_FILE}' not found or schema is unreadable.")
+
+# --- Shared database connection ---
+# One connection is opened at startup and reused by every request, so the page
+# cache stays warm. Queries run in a worker thread to keep the event loop free,
+# and the lock makes sure only one of those threads uses the connection at a time.
+db_conn = sqlite3.connect(DB_FILE, check_same_thread=False, isolation_level=None)
+db_conn.execute("PRAGMA temp_store=MEMORY;")
+db_conn.execute("PRAGMA cache_size=-65536;")  # 64 MB page cache
+db_lock = asyncio.Lock()
+
+def run_query(sql: str) -> tuple[list[str], list[tuple]]:
+    """Executes a query on the shared connection and returns (column_names, rows)."""
+    cursor = db_conn.cursor()
+    try:
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+        return [description[0] for description in cursor.description], rows
+    finally:
+        cursor.close()
+
+# --- Structured output chain (built once and shared by all requests) ---
+llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0)
+# Gemini returns the SqlQuery object natively, so the prompt needs no JSON format instructions
+structured_llm = llm.with_structured_output(SqlQuery)
+
+# Create the prompt template
+prompt = PromptTemplate(
+    template="""You are an expert SQLite data analyst. Based on the database schema, convert the user's question into a single, executable SQLite query.
+    Schema:
+    {schema}
+    
+    Question:
+    {query}""",
+    input_variables=["query", "schema"],
+)
+
+# Create the full generation chain
+chain = prompt | structured_llm
+
 # --- Main Tool Function (Refactored for Structured Output) ---
 @mcp_server.tool
 async def answer_database_question(args: DatabaseToolInput, ctx: Context) -> str:
@@ -51,37 +94,12 @@ async def answer_database_question(args: DatabaseToolInput, ctx: Context) -> str
     user_query = args.query
     await ctx.info(f"Database tool received query: '{user_query}'")
 
-    # --- Initialize components for the structured output chain ---
-    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0)
-    output_parser = JsonOutputParser(pydantic_object=SqlQuery)
-    
-    db_schema = get_db_schema(DB_FILE)
-    if not db_schema:
-        await ctx.error(f"Database file '{DB_FILE}' not found or schema is unreadable.")
-        return f"Error: Database file '{DB_FILE}' not found."
-
-    # Create the prompt template, including the JSON format instructions from the parser
-    prompt = PromptTemplate(
-        template="""You are an expert SQLite data analyst. Based on the database schema, convert the user's question into a single, executable SQLite query.
-        \n{format_instructions}\n
-        Schema:
-        {schema}
-        
-        Question:
-        {query}""",
-        input_variables=["query", "schema"],
-        partial_variables={"format_instructions": output_parser.get_format_instructions()},
-    )
-
-    # Create the full generation chain
-    chain = prompt | llm | output_parser
-
-    await ctx.info("Generating SQL query with LLM (expecting JSON)...")
+    await ctx.info("Generating SQL query with LLM (structured output)...")
     try:
-        # Invoke the chain to get a structured dictionary
-        response_dict = await chain.ainvoke({"query": user_query, "schema": db_schema})
-        generated_sql = response_dict['query']
-        await ctx.info(f"LLM Generated SQL (from JSON): {generated_sql}")
+        # Invoke the chain to get a SqlQuery object
+        response = await chain.ainvoke({"query": user_query, "schema": DB_SCHEMA})
+        generated_sql = response.query
+        await ctx.info(f"LLM Generated SQL (structured): {generated_sql}")
 
     except Exception as e:
         await ctx.error(f"Error during structured SQL generation: {e}")
@@ -94,17 +112,13 @@ async def answer_database_question(args: DatabaseToolInput, ctx: Context) -> str
 
     await ctx.info(f"Executing SQL query: {generated_sql}")
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute(generated_sql)
-        results = cursor.fetchall()
-        conn.close()
+        async with db_lock:
+            column_names, results = await asyncio.to_thread(run_query, generated_sql)
 
         if not results:
             await ctx.info("Query executed successfully, but returned no results.")
             return "Query executed successfully, but returned no results."
 
-        column_names = [description[0] for description in cursor.description]
         formatted_results = f"Query Result:\nColumns: {', '.join(column_names)}\n" + "\n".join(map(str, results))
         
         await ctx.info("Query executed successfully, returning formatted results.")
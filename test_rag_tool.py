@@ -36,11 +36,11 @@ async def main():
                 break
 
             print("\n1. Generating query embedding...")
-            query_embedding = embedding_model.encode(user_query).tolist()
+            query_embedding = embedding_model.encode([user_query], convert_to_numpy=True, normalize_embeddings=True)
             
             print("2. Querying vector store...")
             results = collection.query(
-                query_embeddings=[query_embedding],
+                query_embeddings=query_embedding,
                 n_results=5  # Let's get 5 results to see more
             )
             